@@ -34,17 +34,26 @@ Updates
 
 
 import os
+import sys
+import stat
+import socket
+import time
+import fcntl
+import atexit
+import threading
+import concurrent.futures
 import subprocess
 import logging
 from system_logging import setup_logging
 import pathlib
 import json
-import urllib.request
-import psutil
+import orjson
+import requests
 from pushbullet import Pushbullet, errors as pb_errors
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 import paramiko
+from inotify_simple import INotify, flags
 import yaml
 import configparser
 config = configparser.ConfigParser()
@@ -83,7 +92,7 @@ def remote_harvesters_check():
     global nas_server
     global remote_mount
     nas_server = get_next_nas()
-    log.debug(f'Remote Harvester(s) Found - Selected NAS/Harvester: {nas_server}')
+    log.debug('Remote Harvester(s) Found - Selected NAS/Harvester: %s', nas_server)
     with open(script_path.joinpath(f'export/{nas_server}_export.json'), 'r') as f:
         server = yaml.safe_load(f)
         remote_mount=server['current_plot_drive']
@@ -101,6 +110,63 @@ network_interface = chiaplot.network_interface
 remote_checkfile = script_path.joinpath('remote_transfer_is_active')
 
 
+# Paths we hand to subprocess and ssh over and over, built once as strings.
+plot_dir_str = str(plot_dir).rstrip('/') + '/'
+send_plot_script = str(script_path / 'send_plot.sh')
+receive_plot_script = str(script_path / 'receive_plot.sh')
+kill_nc_script = str(script_path / 'utilities/kill_nc.sh')
+new_plot_received = str(script_path / 'new_plot_received')
+
+
+# When running as a daemon (--daemon), how often (in seconds) we run through
+# main() even if no new plots have shown up, so failed transfers get retried
+# and our system checks still run.
+daemon_poll_interval = 600
+
+
+# Port that receive_plot.sh (netcat) listens on, on the remote harvester and the
+# socket send buffer we ask for when sending plots with sendfile().
+plot_receive_port = 4040
+plot_send_buffer = 16 << 20  # 16 MiB
+plot_send_timeout = 120  # seconds we wait on connect() or for the harvester to accept more data
+plot_close_timeout = 60  # seconds to wait for netcat to finish writing once we are done sending
+
+
+# With sendfile() there is no local nc process to tell us a transfer is running, so
+# we hold an flock() on this file from the start of the send until it is verified.
+# The kernel drops the lock if we die so it can never go stale.
+transfer_lock_file = script_path.joinpath('sendfile_transfer.lock')
+_transfer_lock = None
+
+
+# Sent plots (renamed to *.plot.removing) that we are deleting in the background.
+_plots_being_removed = set()
+
+
+# Pool of open SSH connections keyed by hostname. Every remote command we run
+# reuses the same connection instead of paying for a new ssh handshake.
+_ssh_clients = {}
+_sftp_clients = {}
+_ssh_lock = threading.Lock()  # Only guards _ssh_host_locks
+_ssh_host_locks = {}
+
+
+# Remember host_check() results for a little while so we are not pinging the
+# same harvester over and over. Entries are dropped when a remote call fails.
+_host_alive_cache = {}
+host_check_ttl = 30  # seconds
+
+
+# Keep-alive session for the Glances API so check_transfer() reuses one connection.
+_glances = requests.Session()
+_glances.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+
+# Notification clients are created on first use and reused for every alert after that.
+_pb_client = None
+_twilio_client = None
+
+
 # Setup Module logging. Main logging is configured in system_logging.py
 setup_logging()
 level = logging._checkLevel(chiaplot.log_level)
@@ -113,12 +179,26 @@ log.setLevel(level)
 def get_list_of_plots():
     log.debug('get_list_of_plots() Started')
     try:
-        plot_to_process = [plot for plot in pathlib.Path(plot_dir).glob("*.plot") if plot.stat().st_size > plot_size]
-        log.debug(f'{plot_to_process[0].name}')
-        return (plot_to_process[0].name)
-    except IndexError:
-        log.debug(f'{plot_dir} is Empty: No Plots to Process. Will check again soon!')
+        plots = os.scandir(plot_dir)
+    except FileNotFoundError:
+        log.debug('%s does not exist!', plot_dir)
         return False
+    with plots:
+        for plot in plots:
+            if plot.name.endswith('.plot.removing') and plot.path not in _plots_being_removed:
+                start_remove_plot(plot.path)  # Left behind when we were stopped mid-removal
+                continue
+            if not plot.name.endswith('.plot'):  # Skip temp/partial files without a stat() call
+                continue
+            try:
+                plot_stat = plot.stat(follow_symlinks=False)
+            except FileNotFoundError:  # Moved or renamed since we listed the directory
+                continue
+            if stat.S_ISREG(plot_stat.st_mode) and plot_stat.st_size > plot_size:
+                log.debug('%s', plot.name)
+                return (plot.name)
+    log.debug('%s is Empty: No Plots to Process. Will check again soon!', plot_dir)
+    return False
 
 
 # If we have plots and we are NOT currently transferring another plot and
@@ -129,25 +209,51 @@ def process_plot():
     if not process_control('check_status', 0):
         plot_to_process = get_list_of_plots()
         if plot_to_process and not testing:
-            process_control('set_status', 'start')
-            plot_path = plot_dir + plot_to_process
-            log.info(f'Processing Plot: {plot_path}')
-            log.debug(f'{nas_server} reports remote mount as {remote_mount}')
-            subprocess.call([f'{script_path.joinpath("send_plot.sh")}', plot_path, plot_to_process, nas_server])
+            if chiaplot.use_sendfile and not acquire_transfer_lock():
+                log.debug('Another run is already sending a plot, Exiting')
+                return
             try:
-                subprocess.call(['ssh', nas_server, f'{script_path.joinpath("utilities/kill_nc.sh")}'])  # make sure all of the nc processes are dead on the receiving end
-                log.debug('Remote nc kill called!')
-            except subprocess.CalledProcessError as e:
-                log.warning(e.output)
-            if verify_plot_move(remote_mount, plot_path, plot_to_process):
+                process_control('set_status', 'start')
+                plot_path = plot_dir_str + plot_to_process
+                log.info(f'Processing Plot: {plot_path}')
+                log.debug('%s reports remote mount as %s', nas_server, remote_mount)
+                if chiaplot.use_sendfile:
+                    sent = send_plot_sendfile(plot_path, plot_to_process, nas_server)
+                else:
+                    subprocess.call([send_plot_script, plot_path, plot_to_process, nas_server])
+                    sent = True
+                try:
+                    run_remote(nas_server, kill_nc_script)  # make sure all of the nc processes are dead on the receiving end
+                    log.debug('Remote nc kill called!')
+                except subprocess.CalledProcessError as e:
+                    log.warning(e.output)
+                if not sent:
+                    log.warning(f'FAILURE - Unable to send {plot_path}, will try again soon!')
+                    process_control('set_status', 'stop')
+                    return
+                plot_verified = verify_plot_move(remote_mount, plot_path, plot_to_process)
+                removing_path = None
+                if plot_verified:
+                    # Move the plot out of the *.plot namespace while we still hold the transfer
+                    # lock so no other run can pick it up again while it is being removed.
+                    try:
+                        os.rename(plot_path, plot_path + '.removing')
+                        removing_path = plot_path + '.removing'
+                    except OSError as e:
+                        log.warning(f'Unable to rename {plot_path}: {e}')
+            finally:
+                release_transfer_lock()
+            if plot_verified:
                 log.info('Plot Sizes Match, we have a good plot move!')
             else:
                 log.debug('FAILURE - Plot sizes DO NOT Match - Exiting') # ToDo Do some notification here and then...?
                 process_control('set_status', 'stop') #Set to stop so it will attempt to run again in the event we want to retry....
                 main() # Try Again
+                return
             process_control('set_status', 'stop')
-            os.remove(plot_path)
-            log.info(f'Removing: {plot_path}')
+            if removing_path:
+                start_remove_plot(removing_path)
+                log.info(f'Removing: {plot_path}')
         elif testing:
             log.debug('Testing Only - Nothing will be Done!')
         else:
@@ -155,6 +261,125 @@ def process_plot():
     else:
         return
 
+def send_plot_sendfile(plot_path, plot_to_process, nas_server):
+    """
+    Sends our plot to the remote harvester with sendfile(). The kernel
+    moves the plot straight from the page cache to the socket so we never
+    copy ~101GiB through userspace like pv | nc does. The remote side is the
+    same receive_plot.sh (netcat) that send_plot.sh uses.
+    """
+    log.debug('send_plot_sendfile() Started')
+    try:
+        run_remote(nas_server, f'nohup {receive_plot_script} {plot_to_process} > foo.out 2> foo.err < /dev/null &')
+    except subprocess.CalledProcessError as e:
+        log.warning(e.output)
+        return False
+    sock = None
+    for attempt in range(10):  # Give netcat a moment to start listening
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, plot_send_buffer)
+        sock.settimeout(plot_send_timeout)
+        try:
+            sock.connect((nas_server, plot_receive_port))
+            break
+        except OSError as e:
+            log.debug('Unable to connect to %s:%s (%s), retrying...', nas_server, plot_receive_port, e)
+            sock.close()
+            sock = None
+            time.sleep(1)
+    if sock is None:
+        log.warning(f'Unable to connect to {nas_server}:{plot_receive_port}. Plot not sent!')
+        return False
+    try:
+        with open(plot_path, 'rb') as plot:
+            file_size = os.fstat(plot.fileno()).st_size
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)  # Only send full segments while streaming
+            # socket.sendfile() uses os.sendfile() under the hood and, unlike calling it
+            # directly, honours our timeout so a stalled harvester cannot hang us forever.
+            sent = sock.sendfile(plot)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)  # Flush whatever is left
+        sock.shutdown(socket.SHUT_WR)
+        log.debug('Sent %s of %s bytes to %s', sent, file_size, nas_server)
+        # Wait for netcat to close its end, which it does once it has written
+        # everything we sent. Otherwise kill_nc.sh could cut the plot short.
+        sock.settimeout(plot_close_timeout)
+        while sock.recv(4096):
+            pass
+        return sent == file_size
+    except socket.timeout:
+        log.warning(f'Transfer to {nas_server} timed out!')
+        return False
+    except OSError as e:
+        log.warning(f'send_plot_sendfile error: {e}')
+        return False
+    finally:
+        sock.close()
+
+
+def acquire_transfer_lock():
+    """
+    Takes our sendfile transfer lock. Returns False if another run
+    is already holding it.
+    """
+    global _transfer_lock
+    fd = os.open(transfer_lock_file, os.O_CREAT | os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return False
+    _transfer_lock = fd
+    return True
+
+
+def release_transfer_lock():
+    global _transfer_lock
+    if _transfer_lock is not None:
+        os.close(_transfer_lock)  # Closing the file releases the flock()
+        _transfer_lock = None
+
+
+def sendfile_transfer_running():
+    """
+    Checks if we (or another run of this script) are in the middle of
+    sending a plot with sendfile().
+    """
+    if _transfer_lock is not None:
+        return True
+    if acquire_transfer_lock():
+        release_transfer_lock()
+        return False
+    return True
+
+
+def start_remove_plot(plot_path):
+    """Removes plot_path with remove_plot() in a background thread."""
+    _plots_being_removed.add(plot_path)
+    threading.Thread(target=remove_plot, args=(plot_path,)).start()
+
+
+def remove_plot(plot_path):
+    """
+    Drops the plot from the page cache before deleting it so the ~101GiB it
+    occupied during the transfer is freed up for the next plot. Called in
+    its own thread since unlinking a plot this size can take a while.
+    """
+    try:
+        fd = os.open(plot_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+        os.remove(plot_path)
+    except FileNotFoundError:
+        pass  # Another run got to it first
+    except OSError as e:
+        log.warning(f'Unable to remove {plot_path}: {e}')
+    finally:
+        _plots_being_removed.discard(plot_path)
+
+
 # This assumes passwordless SSH between this host and remote host.
 # Make changes as necessary! Checks to make sure we are not already
 # doing a file transfer. If we are we just return. If not we go ahead
@@ -164,52 +389,52 @@ def process_plot():
 # it for more control so I am leaving it here.
 
 def process_control(command, action):
-    log.debug(f'process_control() called with [{command}] and [{action}]')
+    log.debug('process_control() called with [%s] and [%s]', command, action)
     if host_check(nas_server):
         if command == 'set_status':
             if action == "start":
                 if os.path.isfile(status_file):
-                    log.debug(f'Status File: [{status_file}] already exists!')
+                    log.debug('Status File: [%s] already exists!', status_file)
                     return
                 else:
-                    os.open(status_file, os.O_CREAT)
+                    pathlib.Path(status_file).touch()
                     try:
-                        subprocess.check_output(['ssh', nas_server, 'touch %s' % remote_checkfile])
+                        run_remote(nas_server, 'touch %s' % remote_checkfile)
                     except subprocess.CalledProcessError as e:
                         log.warning(e.output) #Nothing to add here yet as we are not using this function remotely (yet)
             if action == "stop":
                 if os.path.isfile(status_file):
                     os.remove(status_file)
                     try:
-                        subprocess.check_output(['ssh', nas_server, 'rm %s' % remote_checkfile])
+                        run_remote(nas_server, 'rm %s' % remote_checkfile)
                     except subprocess.CalledProcessError as e:
                         log.warning(e.output) #Nothing to add here yet as we are not using this function remotely (yet)
                 else:
-                    log.debug(f'Status File: [{status_file}] does not exist!')
+                    log.debug('Status File: [%s] does not exist!', status_file)
                     return
         elif command == 'check_status':
-            if checkIfProcessRunning('nc') and check_transfer():
-                log.debug(f'NC is running and Network Traffic Exists, We are currently Running a Transfer, Exiting')
+            if chiaplot.use_sendfile and sendfile_transfer_running():
+                log.debug('A sendfile() transfer is currently running, Exiting')
+                return True
+            elif checkIfProcessRunning('nc') and check_transfer():
+                log.debug('NC is running and Network Traffic Exists, We are currently Running a Transfer, Exiting')
                 return True
             elif checkIfProcessRunning('nc') and not check_transfer():
                 log.debug('WARNING! - NC is running but there is no network traffic! Forcing Reset')
                 try:
-                    subprocess.check_output(['ssh', nas_server, 'rm %s' % remote_checkfile])
-                except subprocess.CalledProcessError as e:
-                    log.warning(e.output)
-                try:
-                    subprocess.call(['ssh', nas_server, script_path.joinpath('utilities/kill_nc.sh')])  # make sure all of the nc processes are dead on the receiving end
+                    # make sure all of the nc processes are dead on the receiving end
+                    run_remote_batch(nas_server, ['rm %s' % remote_checkfile, kill_nc_script], separator='; ')
                     log.debug('Remote nc kill called!')
                 except subprocess.CalledProcessError as e:
                     log.warning(e.output)
                 main()
             else:
-                log.debug(f'NC is not running and there is no network traffic!')
+                log.debug('NC is not running and there is no network traffic!')
                 return False
         else:
             return
     else:
-        log.debug(f'WARNING: {nas_server} is OFFLINE! We Cannot Continue......')
+        log.debug('WARNING: %s is OFFLINE! We Cannot Continue......', nas_server)
         notify(f'{nas_server} OFFLINE', f'Your NAS Server: {nas_server} cannot be reached. Plots cannot move! Please Correct IMMEDIATELY!')
         exit()
 
@@ -217,62 +442,85 @@ def process_control(command, action):
 def verify_plot_move(remote_mount, plot_path, plot_to_process):
     log.debug('verify_plot_move() Started')
     log.debug (f'Verifing: {nas_server}: {remote_mount}/{plot_to_process}')
+    remote_plot = f'{remote_mount}/{plot_to_process}'
+    local_plot_size = os.path.getsize(plot_path)
+    log.debug('Local Plot Size Reported as: %s', local_plot_size)
+    # Grab the remote size and flag the new plot (if the sizes match) in one round trip
     try:
-        remote_plot_size = (int(subprocess.check_output(['ssh', nas_server, 'ls -al %s | awk {\'print $5\'}' % f'{remote_mount}/{plot_to_process}'])))
-    except subprocess.CalledProcessError as e:
-        log.warning(e.output) #TODO Do something here...cannot go on...
+        output = run_remote_batch(nas_server, [
+            f'size=$(stat -c %s {remote_plot})',
+            'echo $size',
+            f'if [ "$size" = "{local_plot_size}" ]; then touch {new_plot_received} || echo "Unable to touch new_plot_received"; fi'])
+        output = output.decode().splitlines()
+        remote_plot_size = int(output[0])
+    except (subprocess.CalledProcessError, ValueError, IndexError) as e:
+        log.warning(e) #TODO Do something here...cannot go on...
         quit()
-    log.debug(f'Remote Plot Size Reported as: {remote_plot_size}')
-    local_plot_size = os.path.getsize(plot_path)
-    log.debug(f'Local Plot Size Reported as: {local_plot_size}')
+    log.debug('Remote Plot Size Reported as: %s', remote_plot_size)
     if remote_plot_size == local_plot_size:
-        try:
-            subprocess.check_output(['ssh', nas_server, 'touch %s' % script_path.joinpath("new_plot_received")])
-        except subprocess.CalledProcessError as e:
-            log.warning(e.output)
+        if len(output) > 1:
+            log.warning(output[1])
         return True
     else:
-        log.debug(f'Plot Size Mismatch!')
+        log.debug('Plot Size Mismatch!')
         return False
 
 
 def check_transfer():
     try:
-        with urllib.request.urlopen(f"http://localhost:61208/api/3/network/interface_name/{network_interface}") as url:
-            data = json.loads(url.read().decode())
-            current_transfer_speed =  (data[network_interface][0]['tx']/1000000)
-            if current_transfer_speed < 5:
-                return False
-            else:
-                return True
-    except urllib.error.URLError as e:
-        print (e.reason)
+        r = _glances.get(f"http://localhost:61208/api/3/network/interface_name/{network_interface}", timeout=2)
+        r.raise_for_status()
+        current_transfer_speed =  (orjson.loads(r.content)[network_interface][0]['tx']/1000000)
+        if current_transfer_speed < 5:
+            return False
+        else:
+            return True
+    except requests.exceptions.RequestException as e:
+        print (e)
         exit()
 
 
 def checkIfProcessRunning(processName):
     '''
     Check if there is any running process that contains the given name processName.
+    Reads /proc/<pid>/comm directly instead of building a psutil Process for every pid.
     '''
-    #Iterate over the all the running process
-    for proc in psutil.process_iter():
-        try:
-            # Check if process name contains the given name string.
-            if processName.lower() == proc.name().lower():
-                return True
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
+    process_name = processName.lower()[:15]  # The kernel truncates comm to 15 characters
+    with os.scandir('/proc') as pids:
+        for pid in pids:
+            if not pid.name.isdigit():
+                continue
+            try:
+                with open(f'/proc/{pid.name}/comm', 'rb') as comm:
+                    if comm.read().rstrip(b'\n').decode(errors='replace').lower() == process_name:
+                        return True
+            except OSError:  # Process went away while we were looking
+                pass
     return False
 
 
 def host_check(host):
     """
-    Check to see if a specific host is alive
+    Check to see if a specific host is alive by connecting to its SSH
+    port, or with ping if ping_host_check is set in our config file.
+    Results are cached for host_check_ttl seconds.
     """
-    proc = subprocess.run(
-        ['ping', '-W1', '-q', '-c', '2', host],
-        stdout=subprocess.DEVNULL)
-    return proc.returncode == 0
+    cached = _host_alive_cache.get(host)
+    if cached and time.monotonic() - cached[0] < host_check_ttl:
+        return cached[1]
+    if chiaplot.ping_host_check:
+        proc = subprocess.run(
+            ['ping', '-W1', '-q', '-c', '2', host],
+            stdout=subprocess.DEVNULL)
+        alive = proc.returncode == 0
+    else:
+        try:
+            socket.create_connection((host, 22), timeout=1).close()
+            alive = True
+        except OSError:
+            alive = False
+    _host_alive_cache[host] = (time.monotonic(), alive)
+    return alive
 
 
 def verify_glances_is_running():
@@ -322,9 +570,13 @@ def send_email(recipient, subject, body):
 # Setup to send out Pushbullet alerts. Pushbullet config is in system_info.py
 def send_push_notification(title, message):
     """Part of our notification system. This handles sending PushBullets."""
+    global _pb_client
     try:
-        pb = Pushbullet(chiaplot.pb_api)
-        push = pb.push_note(title, message)
+        try:
+            push = get_pb().push_note(title, message)
+        except pb_errors.InvalidKeyError:
+            _pb_client = None  # Start over with a fresh client and try once more
+            push = get_pb().push_note(title, message)
         log.debug(f"Pushbullet Notification Sent: {title} - {message}")
     except pb_errors.InvalidKeyError as e:
         log.debug(f'Pushbullet Exception: Invalid API Key! Message not sent.')
@@ -332,28 +584,45 @@ def send_push_notification(title, message):
         log.debug(f'Pushbullet Exception: Unknown Pushbullet Error: {e}. Message not sent.')
 
 
+def get_pb():
+    """Returns our Pushbullet client, creating it the first time we need it."""
+    global _pb_client
+    if _pb_client is None:
+        _pb_client = Pushbullet(chiaplot.pb_api)
+    return _pb_client
+
+
 def send_sms_notification(body, phone_number):
     """Part of our notification system. This handles sending SMS messages."""
+    global _twilio_client
     try:
-        client = Client(chiaplot.twilio_account, chiaplot.twilio_token)
-        message = client.messages.create(to=phone_number, from_=chiaplot.twilio_from, body=body)
+        message = get_twilio().messages.create(to=phone_number, from_=chiaplot.twilio_from, body=body)
         log.debug(f"SMS Notification Sent: {body}.")
     except TwilioRestException as e:
+        if e.status == 401:
+            _twilio_client = None  # Bad credentials, build a new client next time
         log.debug(f'Twilio Exception: {e}. Message not sent.')
     except Exception as e:
         log.debug(f'Twilio Exception: {e}. Message not sent.')
 
 
+def get_twilio():
+    """Returns our Twilio client, creating it the first time we need it."""
+    global _twilio_client
+    if _twilio_client is None:
+        _twilio_client = Client(chiaplot.twilio_account, chiaplot.twilio_token)
+    return _twilio_client
+
+
 def check_remote_harvesters():
     """
     This verifies that the remote_harvesters listed above are actually alive.
     """
-    harvesters_check = {}
-    for harvester in chiaplot.remote_harvesters:
-        harvesters_check[harvester] = host_check(harvester)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(chiaplot.remote_harvesters))) as executor:
+        harvesters_check = dict(zip(chiaplot.remote_harvesters, executor.map(host_check, chiaplot.remote_harvesters)))
     dead_hosts = [host for host, alive in harvesters_check.items() if not alive]
     if dead_hosts != []:
-        log.debug(f'WARNING: {dead_hosts} is OFFLINE!')
+        log.debug('WARNING: %s is OFFLINE!', dead_hosts)
     alive_hosts = [host for host, alive in harvesters_check.items() if alive]
     return(alive_hosts)
 
@@ -364,28 +633,116 @@ def remote_harvester_report():
     their export information.
     """
     remote_harvesters = check_remote_harvesters()
-    servers = []
-    for harvester in remote_harvesters:
-        remote_export_file = (script_path.joinpath(f'export/{harvester}_export.json').as_posix())
-        get_remote_exports(harvester, remote_export_file)
-        with open(remote_export_file, 'r') as remote_host:
-            harvester = json.loads(remote_host.read())
-            servers.append(harvester)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        servers = list(executor.map(_fetch_export, remote_harvesters))
     return servers, remote_harvesters
 
 
+def _fetch_export(harvester):
+    """
+    Grabs and loads the export information for a single harvester.
+    """
+    remote_export_file = (script_path.joinpath(f'export/{harvester}_export.json').as_posix())
+    get_remote_exports(harvester, remote_export_file)
+    with open(remote_export_file, 'r') as remote_host:
+        return json.loads(remote_host.read())
+
+
 def get_remote_exports(host, remote_export_file):
     """
     Utilize Paramiko to grab our harvester export information files.
     """
-    ssh = paramiko.SSHClient()
-    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
     try:
-        ssh.connect(host)
-        sftp = ssh.open_sftp()
-        sftp.get(remote_export_file, remote_export_file)
-    finally:
-        ssh.close()
+        get_sftp(host).get(remote_export_file, remote_export_file)
+    except (paramiko.SSHException, OSError):
+        close_ssh(host)
+        _host_alive_cache.pop(host, None)
+        raise
+
+
+def _ssh_host_lock(host):
+    """
+    Returns the lock for host. Each host gets its own so we can connect
+    to several harvesters at the same time.
+    """
+    with _ssh_lock:
+        return _ssh_host_locks.setdefault(host, threading.Lock())
+
+
+def get_ssh(host):
+    """
+    Returns our pooled Paramiko SSHClient for host, connecting the
+    first time we ask for it.
+    """
+    with _ssh_host_lock(host):
+        ssh = _ssh_clients.get(host)
+        transport = ssh.get_transport() if ssh else None
+        if transport is None or not transport.is_active():
+            log.debug('Opening SSH connection to %s', host)
+            ssh = paramiko.SSHClient()
+            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            ssh.connect(host)
+            _ssh_clients[host] = ssh
+        return ssh
+
+
+def get_sftp(host):
+    """
+    Returns an SFTP session on our pooled SSH connection to host. The
+    session is kept open and reused for the rest of the run.
+    """
+    ssh = get_ssh(host)
+    with _ssh_host_lock(host):
+        sftp = _sftp_clients.get(host)
+        if sftp is None or sftp.sock.closed:
+            sftp = ssh.open_sftp()
+            _sftp_clients[host] = sftp
+        return sftp
+
+
+def run_remote(host, command):
+    """
+    Runs command on host over our pooled SSH connection and returns its
+    output. Raises subprocess.CalledProcessError just like check_output()
+    did when we used to shell out to ssh.
+    """
+    try:
+        stdin, stdout, stderr = get_ssh(host).exec_command(command)
+        output = stdout.read()
+        returncode = stdout.channel.recv_exit_status()
+    except (paramiko.SSHException, OSError) as e:
+        close_ssh(host)
+        _host_alive_cache.pop(host, None)
+        raise subprocess.CalledProcessError(255, command, output=str(e))
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, output=output + stderr.read())
+    return output
+
+
+def run_remote_batch(host, commands, separator=' && '):
+    """
+    Runs several commands on host in a single exec_command() round trip.
+    By default each command only runs if the one before it succeeded, pass
+    separator='; ' to always run all of them.
+    """
+    return run_remote(host, separator.join(commands))
+
+
+def close_ssh(host=None):
+    """
+    Closes the pooled SSH connection to host, or all of them if no host is given.
+    """
+    for name in ([host] if host else list(_ssh_clients)):
+        with _ssh_host_lock(name):
+            sftp = _sftp_clients.pop(name, None)
+            if sftp:
+                sftp.close()
+            ssh = _ssh_clients.pop(name, None)
+            if ssh:
+                ssh.close()
+
+
+atexit.register(close_ssh)
 
 
 def get_next_nas():
@@ -411,16 +768,17 @@ def check_temp_drive_utilization():
     in the event we exceed this utilization.
     """
     log.debug('check_temp_drive_utilization() started')
-    if chiaplot.get_critical_temp_dir_usage() != {}:
+    critical = chiaplot.get_critical_temp_dir_usage()
+    if critical:
         if not chiaplot.temp_dirs_critical_alert_sent:
-            chianas.toggle_alert_sent('temp_dirs_critical_alert_sent')
-            for dirs in chiaplot.get_critical_temp_dir_usage().keys():
-                log.debug(f'WARNING: {dirs} is nearing capacity. Sending Alert!')
+            chiaplot.toggle_alert_sent('temp_dirs_critical_alert_sent')
+            for dirs in critical.keys():
+                log.debug('WARNING: %s is nearing capacity. Sending Alert!', dirs)
                 notify('WARNING: Directory Utilization Nearing Capacity',
                        f'WARNING: {dirs} is nearing Capacity\nPlotting is in Jeopardy!\nCheck Your Drives IMMEDIATELY!')
-        else:
-            for dirs in chiaplot.get_critical_temp_dir_usage().keys():
-                log.debug(f'WARNING: {dirs} is nearing capacity. Alert has already been sent!')
+        elif log.isEnabledFor(logging.DEBUG):
+            for dirs in critical.keys():
+                log.debug('WARNING: %s is nearing capacity. Alert has already been sent!', dirs)
     elif chiaplot.temp_dirs_critical_alert_sent:
         chiaplot.toggle_alert_sent('temp_dirs_critical_alert_sent')
         notify('INFORMATION: Directory Utilization', 'INFORMATION: Your Temp Directory is now below High Capacity Warning\nPlotting will Continue')
@@ -435,16 +793,17 @@ def check_dst_drive_utilization():
     in the event we exceed this utilization.
     """
     log.debug('check_dst_drive_utilization() started')
-    if chiaplot.get_critical_dst_dir_usage() != {}:
+    critical = chiaplot.get_critical_dst_dir_usage()
+    if critical:
         if not chiaplot.dst_dirs_critical_alert_sent:
             chiaplot.toggle_alert_sent('dst_dirs_critical_alert_sent')
-            for dirs in chiaplot.get_critical_dst_dir_usage().keys():
-                log.debug(f'WARNING: {dirs} is nearing capacity. Sending Alert!')
+            for dirs in critical.keys():
+                log.debug('WARNING: %s is nearing capacity. Sending Alert!', dirs)
                 notify('WARNING: Directory Utilization Nearing Capacity',
                        f'WARNING: {dirs} is nearing Capacity\nPlotting is in Jeopardy!\nCheck Your Drives IMMEDIATELY!')
-        else:
-            for dirs in chiaplot.get_critical_dst_dir_usage().keys():
-                log.debug(f'WARNING: {dirs} is nearing capacity. Alert has already been sent!')
+        elif log.isEnabledFor(logging.DEBUG):
+            for dirs in critical.keys():
+                log.debug('WARNING: %s is nearing capacity. Alert has already been sent!', dirs)
     elif chiaplot.dst_dirs_critical_alert_sent:
         chiaplot.toggle_alert_sent('dst_dirs_critical_alert_sent')
         notify('INFORMATION: Directory Utilization', 'INFORMATION: Your Temp Directory is now below High Capacity Warning\nPlotting will Continue')
@@ -472,5 +831,40 @@ def main():
         exit()
 
 
-if __name__ == '__main__':
+def daemon_main():
+    """
+    Long running version of main() used by plot_manager.service. We run
+    main() at startup and then every time a plot is written or moved into
+    plot_dir, so our SSH, Glances and notification clients stay open
+    from one plot to the next instead of being rebuilt by every cron run.
+    """
+    log.info('plot_manager.py started in daemon mode')
+    inotify = INotify()
+    inotify.add_watch(plot_dir_str, flags.CLOSE_WRITE | flags.MOVED_TO)
+    drain_plots()
+    while True:
+        events = inotify.read(timeout=daemon_poll_interval * 1000)
+        if not events or any(event.name.endswith('.plot') for event in events):
+            drain_plots()
+
+
+def drain_plots():
+    """
+    main() only sends a single plot, so keep calling it until we run out of
+    plots to send. We stop early if the same plot is still waiting after a
+    pass (a failed transfer) and leave it for the next poll.
+    """
     main()
+    last_plot = None
+    next_plot = get_list_of_plots()
+    while next_plot and next_plot != last_plot:
+        last_plot = next_plot
+        main()
+        next_plot = get_list_of_plots()
+
+
+if __name__ == '__main__':
+    if '--daemon' in sys.argv:
+        daemon_main()
+    else:
+        main()
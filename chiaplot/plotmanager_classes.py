@@ -40,7 +40,7 @@ class PlotManager:
                      notifications, pb, email, sms, temp_dirs, temp_dirs_critical, network_interface,
                      dst_dirs, dst_dirs_critical, dst_dirs_critical_alert_sent,temp_dirs_critical_alert_sent,
                      warnings, emails, phones, twilio_from, twilio_account,
-                     twilio_token, pb_api, logging, log_level):
+                     twilio_token, pb_api, logging, log_level, use_sendfile, ping_host_check):
             self.configured = configured
             self.hostname = hostname
             self.remote_harvesters = remote_harvesters
@@ -64,6 +64,8 @@ class PlotManager:
             self.dst_dirs_critical_alert_sent = dst_dirs_critical_alert_sent
             self.logging = logging
             self.log_level = log_level
+            self.use_sendfile = use_sendfile
+            self.ping_host_check = ping_host_check
 
         @classmethod
         def read_configs(cls):
@@ -92,7 +94,9 @@ class PlotManager:
                     dst_dirs_critical=server['local_plotter']['dst_dirs']['critical'],
                     dst_dirs_critical_alert_sent=server['local_plotter']['dst_dirs']['critical_alert_sent'],
                     logging=server['logging'],
-                    log_level=server['log_level'])
+                    log_level=server['log_level'],
+                    use_sendfile=server.get('use_sendfile', True),
+                    ping_host_check=server.get('ping_host_check', False))
 
 
         def toggle_notification(self, notification):
@@ -176,6 +180,8 @@ class PlotManager:
                         server['local_plotter']['dst_dirs']['critical_alert_sent'] = True
                         with open(config_file, 'w') as f:
                             yaml.safe_dump(server, f)
+            # Keep our copy in step with the file for long running (daemon) callers
+            setattr(self, alert, not getattr(self, alert))
 
 def main():
     print("Not intended to be run directly.")
@@ -347,6 +347,7 @@ update_crontab_coin(){
 ## Add entries into sysctl to improve network performance
 improve_network_performance(){
     must_run_as_root
+    get_current_directory
     echo -e "\nNetwork Performance settings that >>> ${blue}I${nc} <<< use on my 10Gbe connected"
     echo -e "plotters, harvesters, and farmers. Your performance may vary from mine!\n"
     echo -e -n "\nShould we ${yellow}UPDATE${nc} Network Performance Configuration? "
@@ -369,6 +370,10 @@ improve_network_performance(){
             echo "net.ipv4.tcp_slow_start_after_idle = 0 " >> /etc/sysctl.conf
             echo "net.ipv4.ipfrag_high_threshold = 8388608" >> /etc/sysctl.conf
             echo "net.core.netdev_max_backlog = 30000" >> /etc/sysctl.conf
+            cp $current_directory/extras/60-plot-transfer.conf /etc/sysctl.d/
+            echo "tcp_htcp" > /etc/modules-load.d/tcp_htcp.conf
+            modprobe tcp_htcp
+            sysctl -e -p /etc/sysctl.d/60-plot-transfer.conf
             sysctl -e -p /etc/sysctl.conf
             echo -e "${green}DONE${nc}\n"
         else